@@ -21,6 +21,9 @@ class Settings(BaseSettings):
     # LLM Service API Keys
     OPENAI_API_KEY: str = "12345"
 
+    # Artificial delay (in seconds) added to the mock LLM response, used to simulate a real LLM round trip while benchmarking
+    MOCK_LLM_LATENCY_SECONDS: float = 0.0
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,4 +1,5 @@
 import json
+import asyncio
 import redis
 from openai import AsyncOpenAI
 from app.models.presentation_models import PresentationData
@@ -29,6 +30,8 @@ class ContentService:
         logger.info(f"Cache miss for topic: '{topic}'. Generating new content.")
         
         if not is_openai_configured:
+            if settings.MOCK_LLM_LATENCY_SECONDS > 0:
+                await asyncio.sleep(settings.MOCK_LLM_LATENCY_SECONDS)
             content_json = self._get_mock_llm_response(topic, num_slides)
         else:
             # Await the async API call
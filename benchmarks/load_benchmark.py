@@ -0,0 +1,518 @@
+"""
+End-to-end load and throughput benchmark for the presentation service.
+
+It boots the FastAPI app in-process together with an ARQ worker, drives create -> status -> download traffic
+at a configurable concurrency and writes the measured throughput, per-stage latency and worker CPU/memory usage to a JSON file.
+
+Run it from the project root:
+
+    python -m benchmarks.load_benchmark run --jobs 200 --concurrency 20 --llm-latency 0.5 --output baseline.json
+    python -m benchmarks.load_benchmark compare baseline.json candidate.json --threshold 0.10
+
+By default everything runs against fakeredis (the worker then runs in its own thread). Pass --redis-url to use a real
+Redis instead, in which case the worker runs in a separate process. Use a throwaway Redis database, the run writes
+presentation records, content cache entries and ARQ job keys to it.
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_VERSION = 1
+STAGES = ("create", "status", "download", "job")
+PERCENTILES = (50, 95, 99)
+
+# Metrics checked by the compare mode, with whether a higher value is better.
+COMPARED_METRICS = [
+    (("summary", "requests_per_s"), True),
+    (("summary", "jobs_per_s"), True),
+    (("summary", "jobs_failed"), False),
+    *[(("stages", stage, f"p{pct}_ms"), False) for stage in STAGES for pct in PERCENTILES],
+    (("worker", "cpu_ms_per_job"), False),
+    (("worker", "max_rss_mb"), False),
+]
+
+
+def _configure_environment(args) -> None:
+    """
+        Settings are read once when the app is imported, so everything the benchmark overrides has to be in the environment before that.
+    """
+    os.environ["MOCK_LLM_LATENCY_SECONDS"] = str(args.llm_latency)
+    if args.redis_url:
+        os.environ["REDIS_URL"] = args.redis_url
+    if not args.keep_rate_limits:
+        # A single benchmark client would otherwise be throttled by the per-IP limits long before the service is saturated.
+        os.environ["DEFAULT_RATE_LIMIT"] = "1000000/minute"
+        os.environ["CREATE_RATE_LIMIT"] = "1000000/minute"
+
+
+def _set_log_level(level: str) -> None:
+    import logging
+    logging.getLogger().setLevel(level)
+    for name in ("app.core.config", "arq"):
+        logging.getLogger(name).setLevel(level)
+
+
+def _max_rss_mb() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def _process_cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Percentile with linear interpolation between the closest ranks."""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * pct / 100
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+def _summarise_latencies(latencies: List[float], errors: int) -> dict:
+    values = sorted(seconds * 1000 for seconds in latencies)
+    summary = {
+        "count": len(values),
+        "errors": errors,
+        "mean_ms": sum(values) / len(values) if values else None,
+        "max_ms": values[-1] if values else None,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = _percentile(values, pct)
+    return summary
+
+
+# --- Worker ---
+
+async def _run_worker(worker_factory, ready_event, stop_event) -> None:
+    """
+        Runs an ARQ worker until stop_event is set. The worker is built inside the running loop because ARQ binds to the current event loop on creation.
+    """
+    worker = worker_factory()
+    main_task = asyncio.create_task(worker.main())
+    ready_event.set()
+    while not stop_event.is_set() and not main_task.done():
+        await asyncio.sleep(0.05)
+    if main_task.done():
+        # Surface start-up failures (e.g. Redis not reachable) instead of silently reporting an idle worker
+        main_task.result()
+    main_task.cancel()
+    try:
+        await main_task
+    except asyncio.CancelledError:
+        pass
+    await worker.close()
+
+
+def _build_worker(redis_pool=None):
+    from arq.worker import Worker
+    from app.worker import WorkerSettings
+
+    return Worker(
+        functions=WorkerSettings.functions,
+        redis_settings=WorkerSettings.redis_settings,
+        redis_pool=redis_pool,
+        max_jobs=WorkerSettings.max_jobs,
+        handle_signals=False,
+    )
+
+
+async def _skip_redis_info(redis, log_func) -> None:
+    log_func("redis_version=fakeredis")
+
+
+def _worker_thread_main(fake_server, log_level, ready_event, stop_event, results) -> None:
+    """Runs the worker in a thread of the benchmark process, sharing the in-memory fakeredis server with the API."""
+    import arq.worker
+    from arq.connections import ArqRedis
+    from fakeredis import aioredis as fake_aioredis
+
+    # fakeredis does not implement INFO, which ARQ only uses for its start-up log line
+    arq.worker.log_redis_info = _skip_redis_info
+    _set_log_level(log_level)
+    cpu_start = time.thread_time()
+
+    def worker_factory():
+        return _build_worker(ArqRedis(fake_aioredis.FakeRedis(server=fake_server).connection_pool))
+
+    try:
+        asyncio.run(_run_worker(worker_factory, ready_event, stop_event))
+        results.put({"mode": "thread", "cpu_seconds": time.thread_time() - cpu_start, "max_rss_mb": _max_rss_mb()})
+    except Exception as e:
+        ready_event.set()
+        results.put({"mode": "thread", "error": repr(e)})
+
+
+def _worker_process_main(log_level, ready_event, stop_event, results) -> None:
+    """Runs the worker in its own process so that its CPU and memory usage can be measured on their own."""
+    import app.worker  # noqa: F401 - import cost is not part of the measurement
+
+    _set_log_level(log_level)
+    cpu_start = _process_cpu_seconds()
+    try:
+        asyncio.run(_run_worker(_build_worker, ready_event, stop_event))
+        results.put({"mode": "process", "cpu_seconds": _process_cpu_seconds() - cpu_start, "max_rss_mb": _max_rss_mb()})
+    except Exception as e:
+        ready_event.set()
+        results.put({"mode": "process", "error": repr(e)})
+
+
+def _start_worker(args, fake_server):
+    if fake_server is not None:
+        ready_event, stop_event, results = threading.Event(), threading.Event(), queue.Queue()
+        runner = threading.Thread(
+            target=_worker_thread_main,
+            args=(fake_server, args.log_level, ready_event, stop_event, results),
+            name="benchmark-arq-worker",
+            daemon=True,
+        )
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        ready_event, stop_event, results = ctx.Event(), ctx.Event(), ctx.Queue()
+        runner = ctx.Process(
+            target=_worker_process_main,
+            args=(args.log_level, ready_event, stop_event, results),
+            name="benchmark-arq-worker",
+            daemon=True,
+        )
+    runner.start()
+    if not ready_event.wait(timeout=60):
+        raise RuntimeError("ARQ worker did not start within 60 seconds.")
+    return runner, stop_event, results
+
+
+# --- API and traffic ---
+
+class _Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.errors: Dict[str, int] = {stage: 0 for stage in STAGES}
+        self.requests = 0
+        self.jobs_completed = 0
+        self.jobs_failed = 0
+
+    async def request(self, stage: str, send):
+        started = time.perf_counter()
+        try:
+            response = await send()
+        except Exception:
+            self.errors[stage] += 1
+            raise
+        finally:
+            self.requests += 1
+            self.latencies[stage].append(time.perf_counter() - started)
+        if response.is_error:
+            self.errors[stage] += 1
+        return response
+
+
+@asynccontextmanager
+async def _app_started(app, fake_server):
+    """
+        With a real Redis the app's own lifespan is used. With fakeredis the same resources are set up by hand,
+        since the lifespan connects to REDIS_URL directly.
+    """
+    if fake_server is None:
+        async with app.router.lifespan_context(app):
+            yield
+        return
+
+    from arq.connections import ArqRedis
+    from fakeredis import aioredis as fake_aioredis
+    from fastapi_cache import FastAPICache
+    from fastapi_cache.backends.redis import RedisBackend
+
+    redis_cache = fake_aioredis.FakeRedis(server=fake_server, encoding="utf8", decode_responses=True)
+    FastAPICache.init(RedisBackend(redis_cache), prefix="fastapi-cache")
+    app.state.arq_pool = ArqRedis(fake_aioredis.FakeRedis(server=fake_server).connection_pool)
+    try:
+        yield
+    finally:
+        # FastAPICache.clear() relies on EVAL which fakeredis lacks; the in-memory data is discarded anyway
+        await app.state.arq_pool.close()
+
+
+async def _drive_job(client, index: int, args, run_tag: str, recorder: _Recorder, base_path: str, headers: dict) -> None:
+    job_started = time.perf_counter()
+    body = {"topic": f"benchmark {run_tag} {index}", "num_slides": args.num_slides, "template_name": args.template}
+    try:
+        response = await recorder.request("create", lambda: client.post(f"{base_path}/", json=body, headers=headers))
+        if response.status_code != 202:
+            raise RuntimeError(f"create returned {response.status_code}")
+        presentation_path = f"{base_path}/{response.json()['presentation_id']}"
+
+        # The status endpoint caches its response for 60 seconds; no-cache makes each poll see the current status.
+        poll_headers = {**headers, "Cache-Control": "no-cache"}
+        deadline = job_started + args.job_timeout
+        while True:
+            response = await recorder.request("status", lambda: client.get(presentation_path, headers=poll_headers))
+            if response.status_code != 200:
+                raise RuntimeError(f"status returned {response.status_code}")
+            job_status = response.json()["status"]
+            if job_status == "completed":
+                break
+            if job_status == "failed" or time.perf_counter() > deadline:
+                raise RuntimeError(f"job ended with status '{job_status}'")
+            await asyncio.sleep(args.poll_interval)
+
+        response = await recorder.request("download", lambda: client.get(f"{presentation_path}/download", headers=headers))
+        if response.status_code != 200:
+            raise RuntimeError(f"download returned {response.status_code}")
+    except Exception:
+        recorder.jobs_failed += 1
+        recorder.errors["job"] += 1
+        return
+
+    recorder.jobs_completed += 1
+    recorder.latencies["job"].append(time.perf_counter() - job_started)
+
+
+async def _run_load(args, fake_server, worker_alive) -> dict:
+    import httpx
+    from app.main import app
+    from app.core.config import settings
+
+    recorder = _Recorder()
+    run_tag = uuid.uuid4().hex[:8]
+    base_path = f"{settings.API_V1_STR}/presentations"
+    headers = {"X-API-Key": sorted(settings.ALLOWED_API_KEYS)[0]}
+    pending = iter(range(args.jobs))
+
+    async def virtual_user(client):
+        for index in pending:
+            await _drive_job(client, index, args, run_tag, recorder, base_path, headers)
+
+    async def watch_worker():
+        while worker_alive():
+            await asyncio.sleep(0.5)
+        raise RuntimeError("ARQ worker stopped during the run.")
+
+    async with _app_started(app, fake_server):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=args.job_timeout) as client:
+            started = time.perf_counter()
+            load = asyncio.ensure_future(asyncio.gather(*(virtual_user(client) for _ in range(args.concurrency))))
+            watcher = asyncio.ensure_future(watch_worker())
+            await asyncio.wait({load, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            wall_time = time.perf_counter() - started
+            if not load.done():
+                load.cancel()
+                await asyncio.gather(load, return_exceptions=True)
+                await watcher
+            watcher.cancel()
+            await load
+
+    return {
+        "summary": {
+            "wall_time_s": wall_time,
+            "jobs_requested": args.jobs,
+            "jobs_completed": recorder.jobs_completed,
+            "jobs_failed": recorder.jobs_failed,
+            "requests_total": recorder.requests,
+            "requests_per_s": recorder.requests / wall_time,
+            "jobs_per_s": recorder.jobs_completed / wall_time,
+        },
+        "stages": {stage: _summarise_latencies(recorder.latencies[stage], recorder.errors[stage]) for stage in STAGES},
+    }
+
+
+def run_benchmark(args) -> dict:
+    output_path = os.path.abspath(args.output)
+    original_cwd = os.getcwd()
+    _configure_environment(args)
+    # The run changes directory below, keep the app importable here and in the worker process
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+
+    # Generated files are written relative to the working directory, so keep them out of the project tree
+    workdir = tempfile.TemporaryDirectory(prefix="pptx-benchmark-") if args.workdir is None else None
+    os.chdir(args.workdir or workdir.name)
+    os.makedirs("generated_presentations", exist_ok=True)
+
+    fake_server = None
+    if not args.redis_url:
+        try:
+            import fakeredis
+        except ImportError:
+            raise SystemExit("fakeredis is required when no --redis-url is given: pip install fakeredis")
+        import app.services.content_service as content_module
+        import app.services.storage_service as storage_module
+
+        fake_server = fakeredis.FakeServer()
+        content_module.redis_client = fakeredis.FakeRedis(server=fake_server)
+        storage_module.redis_client = fakeredis.FakeRedis(server=fake_server)
+
+    import app.main  # noqa: F401 - settle import-time work before measuring
+    _set_log_level(args.log_level)
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    harness_cpu_start = _process_cpu_seconds()
+    runner, stop_event, worker_results = _start_worker(args, fake_server)
+    try:
+        results = asyncio.run(_run_load(args, fake_server, runner.is_alive))
+    finally:
+        stop_event.set()
+        try:
+            worker = worker_results.get(timeout=60)
+        except queue.Empty:
+            worker = {"error": "the worker did not report its usage"}
+        runner.join(timeout=60)
+        os.chdir(original_cwd)
+        if workdir is not None:
+            workdir.cleanup()
+        if "error" in worker:
+            raise RuntimeError(f"ARQ worker failed: {worker['error']}")
+
+    wall_time = results["summary"]["wall_time_s"]
+    completed = results["summary"]["jobs_completed"]
+    worker["cpu_percent"] = 100 * worker["cpu_seconds"] / wall_time
+    worker["cpu_ms_per_job"] = 1000 * worker["cpu_seconds"] / completed if completed else None
+    if worker["mode"] == "thread":
+        worker["max_rss_note"] = "peak RSS of the whole benchmark process, the worker shares it with the API"
+
+    report = {
+        "schema_version": SCHEMA_VERSION,
+        "started_at": started_at,
+        "config": {
+            "jobs": args.jobs,
+            "concurrency": args.concurrency,
+            "llm_latency_s": args.llm_latency,
+            "num_slides": args.num_slides,
+            "template": args.template,
+            "poll_interval_s": args.poll_interval,
+            "redis": "real" if args.redis_url else "fakeredis",
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        **results,
+        "worker": worker,
+        "harness": {"cpu_seconds": _process_cpu_seconds() - harness_cpu_start, "max_rss_mb": _max_rss_mb()},
+    }
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def print_report(report: dict) -> None:
+    summary, worker = report["summary"], report["worker"]
+    print(
+        f"{summary['jobs_completed']}/{summary['jobs_requested']} jobs in {summary['wall_time_s']:.2f}s: "
+        f"{summary['requests_per_s']:.1f} requests/s, {summary['jobs_per_s']:.2f} jobs/s"
+    )
+    print(f"{'stage':<10}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in report["stages"].items():
+        percentiles = "".join(f"{_format_number(stats[f'p{pct}_ms']):>10}" for pct in PERCENTILES)
+        print(f"{stage:<10}{stats['count']:>8}{stats['errors']:>8}{percentiles}")
+    print(
+        f"worker ({worker['mode']}): {worker['cpu_seconds']:.2f}s CPU ({worker['cpu_percent']:.1f}%), "
+        f"{_format_number(worker['cpu_ms_per_job'])} ms CPU/job, peak RSS {worker['max_rss_mb']:.1f} MB"
+    )
+
+
+# --- Comparison ---
+
+def _format_number(value) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def _lookup(report: dict, path: tuple):
+    value = report
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare_reports(baseline: dict, candidate: dict, threshold: float) -> List[dict]:
+    """Returns one row per compared metric; a row is a regression when the candidate is worse by more than threshold (a fraction)."""
+    rows = []
+    for path, higher_is_better in COMPARED_METRICS:
+        base, cand = _lookup(baseline, path), _lookup(candidate, path)
+        if base is None or cand is None:
+            continue
+        change = (cand - base) / base if base else (0.0 if cand == base else math.inf)
+        worse = -change if higher_is_better else change
+        rows.append({"metric": ".".join(path), "baseline": base, "candidate": cand, "change": change, "regression": worse > threshold})
+    return rows
+
+
+def run_compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    if baseline.get("config") != candidate.get("config"):
+        print("warning: the two runs used different configurations, differences may not be meaningful")
+
+    rows = compare_reports(baseline, candidate, args.threshold)
+    print(f"{'metric':<28}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['metric']:<28}{_format_number(row['baseline']):>12}{_format_number(row['candidate']):>12}{row['change']:>+10.1%}{flag}")
+
+    regressions = [row for row in rows if row["regression"]]
+    print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Load and throughput benchmark for the presentation service.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Run the benchmark and write the results to a JSON file.")
+    run.add_argument("--jobs", type=int, default=100, help="Total number of presentations to create.")
+    run.add_argument("--concurrency", type=int, default=10, help="Number of concurrent clients.")
+    run.add_argument("--llm-latency", type=float, default=0.0, help="Seconds of simulated latency for the mock LLM.")
+    run.add_argument("--num-slides", type=int, default=5)
+    run.add_argument("--template", default="default_light")
+    run.add_argument("--poll-interval", type=float, default=0.05, help="Seconds between status polls.")
+    run.add_argument("--job-timeout", type=float, default=120.0, help="Seconds before a job is counted as failed.")
+    run.add_argument("--redis-url", default=None, help="Use this Redis instead of fakeredis; the worker then runs in its own process.")
+    run.add_argument("--keep-rate-limits", action="store_true", help="Keep the configured API rate limits.")
+    run.add_argument("--workdir", default=None, help="Directory for generated files (default: a temporary directory).")
+    run.add_argument("--log-level", default="WARNING", help="Log level for the app and the worker during the run.")
+    run.add_argument("--output", default="benchmark_results.json")
+
+    compare = subparsers.add_parser("compare", help="Compare two result files and flag regressions.")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=0.10, help="Allowed relative change before flagging (default 0.10).")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _build_parser().parse_args(argv)
+    if args.command == "compare":
+        return run_compare(args)
+    if args.jobs < 1 or args.concurrency < 1:
+        raise SystemExit("--jobs and --concurrency must be at least 1")
+    print_report(run_benchmark(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())